@@ -0,0 +1,146 @@
+import argparse
+import os
+from glob import glob
+from typing import Iterator, List, Optional
+
+from onnxruntime.quantization import (
+    CalibrationDataReader,
+    QuantFormat,
+    QuantType,
+    quantize_static,
+)
+from onnxruntime.quantization.shape_inference import quant_pre_process
+
+from inference.core.env import API_KEY, QUANTIZED_WEIGHTS_DIR
+from inference.core.models.classification_base import (
+    ClassificationBaseOnnxRoboflowInferenceModel,
+    get_quantized_weights_path,
+)
+from inference.models.utils import get_model
+
+IMAGES_EXTENSIONS = ("jpg", "jpeg", "png", "bmp", "webp")
+DESCRIPTION = """
+Script to quantize classification ONNX model to int8 with static calibration.
+
+Calibration images go through the model's own preprocessing (resize method, static crop,
+contrast, grayscale and normalisation), exactly as during inference. By default, the
+result is saved as <quantized weights dir>/<model_id>/<weights without extension>.quant.onnx,
+which is where the server looks for it once QUANTIZED_WEIGHTS_DIR is set in its environment.
+
+Quantized weights are never downloaded - the directory must be available to the server
+(e.g. mounted as a volume). It lives outside of the model cache, so it is not affected when
+models are evicted from the cache.
+"""
+
+
+class ClassificationCalibrationDataReader(CalibrationDataReader):
+    def __init__(
+        self,
+        model: ClassificationBaseOnnxRoboflowInferenceModel,
+        images_paths: List[str],
+    ):
+        self._model = model
+        self._images_paths = images_paths
+        self._iterator: Optional[Iterator[dict]] = None
+
+    def get_next(self) -> Optional[dict]:
+        if self._iterator is None:
+            self._iterator = (
+                {self._model.input_name: self._model.preprocess(path)[0]}
+                for path in self._images_paths
+            )
+        return next(self._iterator, None)
+
+    def rewind(self) -> None:
+        self._iterator = None
+
+
+def main(
+    model_id: str,
+    api_key: Optional[str],
+    images_dir: str,
+    quantized_weights_dir: Optional[str],
+    output_path: Optional[str],
+) -> None:
+    if output_path is None and quantized_weights_dir is None:
+        raise ValueError("Either quantized weights dir or output path must be given")
+    images_paths = sorted(
+        path
+        for extension in IMAGES_EXTENSIONS
+        for path in glob(os.path.join(images_dir, f"*.{extension}"))
+    )
+    if not images_paths:
+        raise ValueError(f"No calibration images found in {images_dir}")
+    model = get_model(model_id=model_id, api_key=api_key)
+    if not isinstance(model, ClassificationBaseOnnxRoboflowInferenceModel):
+        raise ValueError(f"Model {model_id} is not a classification model")
+    weights_path = model.cache_file(model.weights_file)
+    if output_path is None:
+        output_path = get_quantized_weights_path(
+            quantized_weights_dir=quantized_weights_dir,
+            model_id=model.endpoint,
+            weights_file=model.weights_file,
+        )
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    preprocessed_model_path = f"{output_path}.preprocessed"
+    quant_pre_process(weights_path, preprocessed_model_path)
+    try:
+        print(f"Calibrating on {len(images_paths)} images")
+        quantize_static(
+            model_input=preprocessed_model_path,
+            model_output=output_path,
+            calibration_data_reader=ClassificationCalibrationDataReader(
+                model=model, images_paths=images_paths
+            ),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+        )
+    finally:
+        os.remove(preprocessed_model_path)
+    print(f"Quantized model saved under {output_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=DESCRIPTION,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--model_id", type=str, required=True)
+    parser.add_argument(
+        "--api_key",
+        type=str,
+        required=False,
+        default=API_KEY,
+        help="Roboflow API key, defaults to the one set in environment",
+    )
+    parser.add_argument(
+        "--images_dir",
+        type=str,
+        required=True,
+        help="Directory with representative images used for calibration",
+    )
+    parser.add_argument(
+        "--quantized_weights_dir",
+        type=str,
+        required=False,
+        default=QUANTIZED_WEIGHTS_DIR,
+        help="Directory the server reads quantized weights from, defaults to "
+        "QUANTIZED_WEIGHTS_DIR set in environment",
+    )
+    parser.add_argument(
+        "--output_path",
+        type=str,
+        required=False,
+        default=None,
+        help="Overrides the default location inside quantized weights dir",
+    )
+    args = parser.parse_args()
+    main(
+        model_id=args.model_id,
+        api_key=args.api_key,
+        images_dir=args.images_dir,
+        quantized_weights_dir=args.quantized_weights_dir,
+        output_path=args.output_path,
+    )
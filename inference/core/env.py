@@ -4,6 +4,7 @@ import warnings
 
 from dotenv import load_dotenv
 
+from inference.core.exceptions import InvalidEnvironmentVariableError
 from inference.core.utils.environment import safe_split_value, str2bool
 from inference.core.warnings import InferenceDeprecationWarning
 
@@ -217,6 +218,34 @@ if MAX_BATCH_SIZE is not None:
 else:
     MAX_BATCH_SIZE = float("inf")
 
+# Maximum number of images sent to ONNX session of classification model in a single run,
+# bigger batches are split into sequential sub-batches, default is infinite
+CLASSIFICATION_SUB_BATCH_SIZE = os.getenv("CLASSIFICATION_SUB_BATCH_SIZE", None)
+if CLASSIFICATION_SUB_BATCH_SIZE is not None:
+    CLASSIFICATION_SUB_BATCH_SIZE = int(CLASSIFICATION_SUB_BATCH_SIZE)
+    if CLASSIFICATION_SUB_BATCH_SIZE < 1:
+        raise InvalidEnvironmentVariableError(
+            f"Expected CLASSIFICATION_SUB_BATCH_SIZE to be a positive integer but got "
+            f"'{CLASSIFICATION_SUB_BATCH_SIZE}'"
+        )
+else:
+    CLASSIFICATION_SUB_BATCH_SIZE = float("inf")
+
+# Number of concurrent ONNX runs (each pinned to single intra-op thread) used by classification
+# models to process big batches on CPU execution provider, default is 1 (disabled)
+CLASSIFICATION_CPU_CONCURRENT_RUNS = int(
+    os.getenv("CLASSIFICATION_CPU_CONCURRENT_RUNS", 1)
+)
+if CLASSIFICATION_CPU_CONCURRENT_RUNS < 1:
+    raise InvalidEnvironmentVariableError(
+        f"Expected CLASSIFICATION_CPU_CONCURRENT_RUNS to be a positive integer but got "
+        f"'{CLASSIFICATION_CPU_CONCURRENT_RUNS}'"
+    )
+
+# Directory with int8-quantized classification weights (<model_id>/<weights>.quant.onnx), kept
+# outside of MODEL_CACHE_DIR so that it survives model eviction, default is None (disabled)
+QUANTIZED_WEIGHTS_DIR = os.getenv("QUANTIZED_WEIGHTS_DIR", None)
+
 # Maximum number of candidates, default is 3000
 MAX_CANDIDATES_ENV = "MAX_CANDIDATES"
 DEFAULT_MAX_CANDIDATES = 3000
@@ -1,8 +1,14 @@
-from io import BytesIO
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from time import perf_counter
-from typing import Any, List, Tuple, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
+import cv2
 import numpy as np
+import onnxruntime
 from PIL import Image, ImageDraw, ImageFont
 
 from inference.core.entities.requests.inference import ClassificationInferenceRequest
@@ -12,12 +18,72 @@ from inference.core.entities.responses.inference import (
     InferenceResponseImage,
     MultiLabelClassificationInferenceResponse,
 )
+from inference.core.env import (
+    CLASSIFICATION_CPU_CONCURRENT_RUNS,
+    CLASSIFICATION_SUB_BATCH_SIZE,
+    QUANTIZED_WEIGHTS_DIR,
+)
+from inference.core.logger import logger
 from inference.core.models.roboflow import OnnxRoboflowInferenceModel
 from inference.core.models.types import PreprocessReturnMetadata
 from inference.core.models.utils.validate import (
     get_num_classes_from_model_prediction_shape,
 )
-from inference.core.utils.image_utils import load_image_rgb
+from inference.core.utils.image_utils import (
+    encode_image_to_jpeg_bytes,
+    load_image_rgb,
+)
+
+NORMALIZATION_MEAN = (0.5, 0.5, 0.5)
+NORMALIZATION_STD = (0.5, 0.5, 0.5)
+# (x / 255 - mean) / std folded into a single multiply-subtract: x * scale - bias
+NORMALIZATION_SCALE = np.array(
+    [1.0 / (255.0 * s) for s in NORMALIZATION_STD], dtype=np.float32
+).reshape(1, 3, 1, 1)
+NORMALIZATION_BIAS = np.array(
+    [m / s for m, s in zip(NORMALIZATION_MEAN, NORMALIZATION_STD)], dtype=np.float32
+).reshape(1, 3, 1, 1)
+DEFAULT_FONT = ImageFont.load_default()
+
+
+@lru_cache(maxsize=256)
+def make_label_button(text: str, color: str) -> Image.Image:
+    """Render label button - the text on a box of given color with 10px margins.
+
+    Buttons are cached, as the same labels are rendered over and over again when
+    visualising predictions of a model with few classes. Returned image must not be modified.
+
+    Args:
+        text (str): The label text.
+        color (str): The button color.
+
+    Returns:
+        Image.Image: RGBA image of the button.
+    """
+    text_size = DEFAULT_FONT.getbbox(text)
+    button_size = (text_size[2] + 20, text_size[3] + 20)
+    button_img = Image.new("RGBA", button_size, color)
+    button_draw = ImageDraw.Draw(button_img)
+    button_draw.text((10, 10), text, font=DEFAULT_FONT, fill=(255, 255, 255, 255))
+    return button_img
+
+
+def get_quantized_weights_path(
+    quantized_weights_dir: str, model_id: str, weights_file: str
+) -> str:
+    weights_name, _ = os.path.splitext(weights_file)
+    return os.path.join(quantized_weights_dir, model_id, f"{weights_name}.quant.onnx")
+
+
+def runs_on_cpu_execution_provider(
+    providers: List[Union[Tuple[str, Dict], str]]
+) -> bool:
+    available_providers = set(onnxruntime.get_available_providers())
+    for provider in providers:
+        name = provider[0] if isinstance(provider, tuple) else provider
+        if name in available_providers:
+            return name == "CPUExecutionProvider"
+    return False
 
 
 class ClassificationBaseOnnxRoboflowInferenceModel(OnnxRoboflowInferenceModel):
@@ -37,8 +103,70 @@ class ClassificationBaseOnnxRoboflowInferenceModel(OnnxRoboflowInferenceModel):
 
     def __init__(self, *args, **kwargs):
         """Initialize the model, setting whether it is multiclass or not."""
+        # thread-local, as the buffers are written in place while building each batch
+        self._input_buffers = threading.local()
+        self._optimal_batch = CLASSIFICATION_SUB_BATCH_SIZE
+        self._cpu_concurrent_runs = CLASSIFICATION_CPU_CONCURRENT_RUNS
+        # decided once, when session options are built, and drives the fan-out too
+        self._cpu_runs_pinned = False
+        self._cpu_executor: Optional[ThreadPoolExecutor] = None
         super().__init__(*args, **kwargs)
         self.multiclass = self.environment.get("MULTICLASS", False)
+        if self._cpu_runs_pinned and getattr(self, "onnx_session", None) is not None:
+            self._cpu_executor = ThreadPoolExecutor(
+                max_workers=self._cpu_concurrent_runs
+            )
+
+    def get_onnx_weights_path(self) -> str:
+        weights_path = super().get_onnx_weights_path()
+        if QUANTIZED_WEIGHTS_DIR is None:
+            return weights_path
+        # looked up outside of model cache, which is wiped whenever model is evicted
+        quantized_weights_path = get_quantized_weights_path(
+            quantized_weights_dir=QUANTIZED_WEIGHTS_DIR,
+            model_id=self.endpoint,
+            weights_file=self.weights_file,
+        )
+        if os.path.isfile(quantized_weights_path):
+            logger.debug(f"Using quantized weights: {quantized_weights_path}")
+            return quantized_weights_path
+        logger.debug(
+            f"Quantized weights {quantized_weights_path} not available for model "
+            f"{self.endpoint} - using {weights_path}"
+        )
+        return weights_path
+
+    def get_onnx_session_options(
+        self, providers: List[Union[Tuple[str, Dict], str]]
+    ) -> onnxruntime.SessionOptions:
+        session_options = super().get_onnx_session_options(providers=providers)
+        self._cpu_runs_pinned = (
+            self._cpu_concurrent_runs > 1
+            and runs_on_cpu_execution_provider(providers=providers)
+        )
+        if self._cpu_runs_pinned:
+            # several single-threaded runs in parallel beat one run spread across cores
+            session_options.intra_op_num_threads = 1
+        return session_options
+
+    def clear_cache(self) -> None:
+        # model managers call this when unloading the model
+        if self._cpu_executor is not None:
+            self._cpu_executor.shutdown(wait=False)
+            self._cpu_executor = None
+        super().clear_cache()
+
+    def initialize_model(self) -> None:
+        super().initialize_model()
+        onnx_session = getattr(self, "onnx_session", None)
+        if onnx_session is not None:
+            # resolved once, as outputs are bound on every run
+            self._output_names = [output.name for output in onnx_session.get_outputs()]
+
+    def load_model_artifacts_from_cache(self) -> None:
+        super().load_model_artifacts_from_cache()
+        # object array allows building ordered class names lists with fancy-indexing
+        self._class_names_arr = np.asarray(self.class_names, dtype=object)
 
     def draw_predictions(self, inference_request, inference_response):
         """Draw prediction visuals on an image.
@@ -55,24 +183,16 @@ class ClassificationBaseOnnxRoboflowInferenceModel(OnnxRoboflowInferenceModel):
         image = load_image_rgb(inference_request.image)
         image = Image.fromarray(image)
         draw = ImageDraw.Draw(image)
-        font = ImageFont.load_default()
         if isinstance(inference_response.predictions, list):
             prediction = inference_response.predictions[0]
             color = self.colors.get(prediction.class_name, "#4892EA")
             draw.rectangle(
-                [0, 0, image.size[1], image.size[0]],
+                [0, 0, image.size[0], image.size[1]],
                 outline=color,
                 width=inference_request.visualization_stroke_width,
             )
             text = f"{prediction.class_id} - {prediction.class_name} {prediction.confidence:.2f}"
-            text_size = font.getbbox(text)
-
-            # set button size + 10px margins
-            button_size = (text_size[2] + 20, text_size[3] + 20)
-            button_img = Image.new("RGBA", button_size, color)
-            # put text on button with 10px margins
-            button_draw = ImageDraw.Draw(button_img)
-            button_draw.text((10, 10), text, font=font, fill=(255, 255, 255, 255))
+            button_img = make_label_button(text=text, color=color)
 
             # put button on source image in position (0, 0)
             image.paste(button_img, (0, 0))
@@ -80,11 +200,10 @@ class ClassificationBaseOnnxRoboflowInferenceModel(OnnxRoboflowInferenceModel):
             if len(inference_response.predictions) > 0:
                 box_color = "#4892EA"
                 draw.rectangle(
-                    [0, 0, image.size[1], image.size[0]],
+                    [0, 0, image.size[0], image.size[1]],
                     outline=box_color,
                     width=inference_request.visualization_stroke_width,
                 )
-            row = 0
             predictions = [
                 (cls_name, pred)
                 for cls_name, pred in inference_response.predictions.items()
@@ -92,26 +211,36 @@ class ClassificationBaseOnnxRoboflowInferenceModel(OnnxRoboflowInferenceModel):
             predictions = sorted(
                 predictions, key=lambda x: x[1].confidence, reverse=True
             )
-            for i, (cls_name, pred) in enumerate(predictions):
-                color = self.colors.get(cls_name, "#4892EA")
-                text = f"{cls_name} {pred.confidence:.2f}"
-                text_size = font.getbbox(text)
-
-                # set button size + 10px margins
-                button_size = (text_size[2] + 20, text_size[3] + 20)
-                button_img = Image.new("RGBA", button_size, color)
-                # put text on button with 10px margins
-                button_draw = ImageDraw.Draw(button_img)
-                button_draw.text((10, 10), text, font=font, fill=(255, 255, 255, 255))
-
-                # put button on source image in position (0, 0)
-                image.paste(button_img, (0, row))
-                row += button_size[1]
-
-        buffered = BytesIO()
-        image = image.convert("RGB")
-        image.save(buffered, format="JPEG")
-        return buffered.getvalue()
+            buttons = [
+                np.asarray(
+                    make_label_button(
+                        text=f"{cls_name} {pred.confidence:.2f}",
+                        color=self.colors.get(cls_name, "#4892EA"),
+                    )
+                )
+                for cls_name, pred in predictions
+            ]
+            if buttons:
+                # stack buttons into single strip, transparent where narrower than the widest
+                strip = np.zeros(
+                    (
+                        sum(button.shape[0] for button in buttons),
+                        max(button.shape[1] for button in buttons),
+                        4,
+                    ),
+                    dtype=np.uint8,
+                )
+                row = 0
+                for button in buttons:
+                    strip[row : row + button.shape[0], : button.shape[1]] = button
+                    row += button.shape[0]
+                strip_img = Image.fromarray(strip, mode="RGBA")
+                # put buttons stacked on top of each other in position (0, 0)
+                image.paste(strip_img, (0, 0), mask=strip_img)
+
+        image = cv2.cvtColor(np.asarray(image.convert("RGB")), cv2.COLOR_RGB2BGR)
+        # libjpeg-turbo bundled with OpenCV encodes faster than Pillow's libjpeg
+        return encode_image_to_jpeg_bytes(image, jpeg_quality=75)
 
     def get_infer_bucket_file_list(self) -> list:
         """Get the list of required files for inference.
@@ -171,21 +300,66 @@ class ClassificationBaseOnnxRoboflowInferenceModel(OnnxRoboflowInferenceModel):
         return_image_dims=False,
         **kwargs,
     ) -> Union[ClassificationInferenceResponse, List[ClassificationInferenceResponse]]:
-        predictions = predictions[0]
+        # first (and only) model output, holding scores of shape (batch_size, num_classes)
+        predictions = predictions[0][0]
         return self.make_response(
             predictions, preprocess_return_metadata["img_dims"], **kwargs
         )
 
     def predict(self, img_in: np.ndarray, **kwargs) -> Tuple[np.ndarray]:
-        predictions = self.onnx_session.run(None, {self.input_name: img_in})
+        # parallel server hands over batches as lists of preprocessed CHW images
+        img_in = np.asarray(img_in)
+        batch_size = img_in.shape[0]
+        # read once - `clear_cache(...)` may drop it while the request is in flight
+        cpu_executor = self._cpu_executor
+        # ORT does not split batches on its own - past the sweet spot throughput drops
+        sub_batch_size = self._optimal_batch
+        if cpu_executor is not None and batch_size >= 2 * self._cpu_concurrent_runs:
+            sub_batch_size = min(
+                sub_batch_size, math.ceil(batch_size / self._cpu_concurrent_runs)
+            )
+        if batch_size <= sub_batch_size:
+            return (self._run_onnx_session(img_in),)
+        sub_batch_size = int(sub_batch_size)
+        sub_batches = [
+            img_in[i : i + sub_batch_size] for i in range(0, batch_size, sub_batch_size)
+        ]
+        futures = []
+        if cpu_executor is not None:
+            try:
+                for sub_batch in sub_batches:
+                    futures.append(
+                        cpu_executor.submit(self._run_onnx_session, sub_batch)
+                    )
+            except RuntimeError:
+                # executor shut down by `clear_cache(...)` - the rest runs in this thread
+                pass
+        sub_batches_predictions = [future.result() for future in futures] + [
+            self._run_onnx_session(sub_batch)
+            for sub_batch in sub_batches[len(futures) :]
+        ]
+        predictions = [
+            np.concatenate(output_parts, axis=0)
+            for output_parts in zip(*sub_batches_predictions)
+        ]
         return (predictions,)
 
+    def _run_onnx_session(self, img_in: np.ndarray) -> List[np.ndarray]:
+        # binding the host buffer directly lets ORT read it without the feed-dict copy
+        io_binding = self.onnx_session.io_binding()
+        io_binding.bind_cpu_input(self.input_name, np.ascontiguousarray(img_in))
+        for output_name in self._output_names:
+            io_binding.bind_output(output_name)
+        self.onnx_session.run_with_iobinding(io_binding)
+        return io_binding.copy_outputs_to_cpu()
+
     def preprocess(
         self, image: Any, **kwargs
     ) -> Tuple[np.ndarray, PreprocessReturnMetadata]:
         if isinstance(image, list):
-            imgs_with_dims = [
-                self.preproc_image(
+            img_in, img_dims = None, []
+            for idx, i in enumerate(image):
+                img, dims = self.preproc_image(
                     i,
                     disable_preproc_auto_orient=kwargs.get(
                         "disable_preproc_auto_orient", False
@@ -200,10 +374,12 @@ class ClassificationBaseOnnxRoboflowInferenceModel(OnnxRoboflowInferenceModel):
                         "disable_preproc_static_crop", False
                     ),
                 )
-                for i in image
-            ]
-            imgs, img_dims = zip(*imgs_with_dims)
-            img_in = np.concatenate(imgs, axis=0)
+                if img_in is None:
+                    img_in = self._get_input_buffer(
+                        shape=(len(image),) + img.shape[1:], dtype=img.dtype
+                    )
+                img_in[idx] = img[0]
+                img_dims.append(dims)
         else:
             img_in, img_dims = self.preproc_image(
                 image,
@@ -220,17 +396,33 @@ class ClassificationBaseOnnxRoboflowInferenceModel(OnnxRoboflowInferenceModel):
             )
             img_dims = [img_dims]
 
-        img_in /= 255.0
+        img_in = img_in.astype(np.float32, copy=False)
+        np.multiply(img_in, NORMALIZATION_SCALE, out=img_in)
+        np.subtract(img_in, NORMALIZATION_BIAS, out=img_in)
+        return img_in, PreprocessReturnMetadata({"img_dims": img_dims})
 
-        mean = (0.5, 0.5, 0.5)
-        std = (0.5, 0.5, 0.5)
+    def _get_input_buffer(self, shape: Tuple[int, ...], dtype: np.dtype) -> np.ndarray:
+        """Get batch input buffer of given shape, reused across calls made by the same thread.
 
-        img_in = img_in.astype(np.float32)
+        Each thread keeps a single buffer, grown when a bigger batch arrives, so memory
+        retained per thread is bounded by the biggest batch it has processed.
 
-        img_in[:, 0, :, :] = (img_in[:, 0, :, :] - mean[0]) / std[0]
-        img_in[:, 1, :, :] = (img_in[:, 1, :, :] - mean[1]) / std[1]
-        img_in[:, 2, :, :] = (img_in[:, 2, :, :] - mean[2]) / std[2]
-        return img_in, PreprocessReturnMetadata({"img_dims": img_dims})
+        Args:
+            shape (Tuple[int, ...]): Shape of the batch in NCHW format.
+            dtype (np.dtype): Data type of the batch.
+
+        Returns:
+            np.ndarray: Uninitialised buffer to be filled with preprocessed images.
+        """
+        buffer = getattr(self._input_buffers, "buffer", None)
+        if (
+            buffer is None
+            or buffer.shape[0] < shape[0]
+            or buffer.shape[1:] != tuple(shape[1:])
+            or buffer.dtype != dtype
+        ):
+            buffer = self._input_buffers.buffer = np.empty(shape, dtype=dtype)
+        return buffer[: shape[0]]
 
     def infer_from_request(
         self,
@@ -278,7 +470,7 @@ class ClassificationBaseOnnxRoboflowInferenceModel(OnnxRoboflowInferenceModel):
         Create response objects for the given predictions and image dimensions.
 
         Args:
-            predictions (list): List of prediction arrays from the inference process.
+            predictions (np.ndarray): Model scores of shape `(batch_size, num_classes)`, one row per image.
             img_dims (list): List of tuples indicating the dimensions (width, height) of each image.
             confidence (float, optional): Confidence threshold for filtering predictions. Defaults to 0.5.
             **kwargs: Additional parameters to influence the response creation process.
@@ -293,17 +485,17 @@ class ClassificationBaseOnnxRoboflowInferenceModel(OnnxRoboflowInferenceModel):
         """
         responses = []
         confidence_threshold = float(confidence)
-        for ind, prediction in enumerate(predictions):
-            if self.multiclass:
-                preds = prediction[0]
-                results = dict()
-                predicted_classes = []
-                for i, o in enumerate(preds):
-                    cls_name = self.class_names[i]
-                    score = float(o)
-                    results[cls_name] = {"confidence": score, "class_id": i}
-                    if score > confidence_threshold:
-                        predicted_classes.append(cls_name)
+        if self.multiclass:
+            scores = predictions.astype(np.float64)
+            above_threshold = scores > confidence_threshold
+            for ind, image_scores in enumerate(scores.tolist()):
+                results = {
+                    cls_name: {"confidence": score, "class_id": i}
+                    for i, (cls_name, score) in enumerate(
+                        zip(self.class_names, image_scores)
+                    )
+                }
+                predicted_classes = self._class_names_arr[above_threshold[ind]].tolist()
                 response = MultiLabelClassificationInferenceResponse(
                     image=InferenceResponseImage(
                         width=img_dims[ind][0], height=img_dims[ind][1]
@@ -311,44 +503,58 @@ class ClassificationBaseOnnxRoboflowInferenceModel(OnnxRoboflowInferenceModel):
                     predicted_classes=predicted_classes,
                     predictions=results,
                 )
-            else:
-                preds = prediction[0]
-                preds = self.softmax(preds)
-                results = []
-                for i, cls_name in enumerate(self.class_names):
-                    score = float(preds[i])
-                    pred = {
-                        "class_id": i,
-                        "class": cls_name,
-                        "confidence": round(score, 4),
-                    }
-                    results.append(pred)
-                results = sorted(results, key=lambda x: x["confidence"], reverse=True)
-
-                response = ClassificationInferenceResponse(
-                    image=InferenceResponseImage(
-                        width=img_dims[ind][1], height=img_dims[ind][0]
-                    ),
-                    predictions=results,
-                    top=results[0]["class"],
-                    confidence=results[0]["confidence"],
-                )
+                responses.append(response)
+            return responses
+        probabilities = self.softmax(predictions, axis=1)
+        confidences = np.round(probabilities.astype(np.float64), 4)
+        orders = np.argsort(-confidences, axis=1, kind="stable")
+        sorted_confidences = np.take_along_axis(confidences, orders, axis=1)
+        sorted_class_names = self._class_names_arr[orders]
+        for ind, (order, names, scores) in enumerate(
+            zip(
+                orders.tolist(),
+                sorted_class_names.tolist(),
+                sorted_confidences.tolist(),
+            )
+        ):
+            results = [
+                {
+                    "class_id": i,
+                    "class": name,
+                    "confidence": score,
+                }
+                for i, name, score in zip(order, names, scores)
+            ]
+            response = ClassificationInferenceResponse(
+                image=InferenceResponseImage(
+                    width=img_dims[ind][1], height=img_dims[ind][0]
+                ),
+                predictions=results,
+                top=results[0]["class"],
+                confidence=results[0]["confidence"],
+            )
             responses.append(response)
-
         return responses
 
     @staticmethod
-    def softmax(x):
+    def softmax(x, axis: int = -1):
         """Compute softmax values for each set of scores in x.
 
         Args:
             x (np.array): The input array containing the scores.
+            axis (int, optional): The axis holding the scores of a single set. Defaults to -1, so that batched `(B, C)` inputs are normalised per row.
 
         Returns:
             np.array: The softmax values for each set of scores.
         """
-        e_x = np.exp(x - np.max(x))
-        return e_x / e_x.sum()
+        e_x = np.subtract(
+            x,
+            np.max(x, axis=axis, keepdims=True),
+            dtype=np.result_type(x, np.float32),
+        )
+        np.exp(e_x, out=e_x)
+        e_x /= e_x.sum(axis=axis, keepdims=True)
+        return e_x
 
     def get_model_output_shape(self) -> Tuple[int, int, int]:
         test_image = (np.random.rand(1024, 1024, 3) * 255).astype(np.uint8)
@@ -703,14 +703,9 @@ class OnnxRoboflowInferenceModel(RoboflowInferenceModel):
             if not self.load_weights:
                 providers = ["OpenVINOExecutionProvider", "CPUExecutionProvider"]
             try:
-                session_options = onnxruntime.SessionOptions()
-                # TensorRT does better graph optimization for its EP than onnx
-                if has_trt(providers):
-                    session_options.graph_optimization_level = (
-                        onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL
-                    )
+                session_options = self.get_onnx_session_options(providers=providers)
                 self.onnx_session = onnxruntime.InferenceSession(
-                    self.cache_file(self.weights_file),
+                    self.get_onnx_weights_path(),
                     providers=providers,
                     sess_options=session_options,
                 )
@@ -788,6 +783,33 @@ class OnnxRoboflowInferenceModel(RoboflowInferenceModel):
                 )
         logger.debug("Model initialisation finished.")
 
+    def get_onnx_weights_path(self) -> str:
+        """Returns the path of the cached weights file used to create the ONNX session.
+
+        Returns:
+            str: Full path to the weights file.
+        """
+        return self.cache_file(self.weights_file)
+
+    def get_onnx_session_options(
+        self, providers: List[Union[Tuple[str, Dict], str]]
+    ) -> onnxruntime.SessionOptions:
+        """Creates options for the ONNX session that will run with given execution providers.
+
+        Args:
+            providers (List[Union[Tuple[str, Dict], str]]): Execution providers in priority order.
+
+        Returns:
+            onnxruntime.SessionOptions: Options for the ONNX session.
+        """
+        session_options = onnxruntime.SessionOptions()
+        # TensorRT does better graph optimization for its EP than onnx
+        if has_trt(providers):
+            session_options.graph_optimization_level = (
+                onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL
+            )
+        return session_options
+
     def load_image(
         self,
         image: Any,
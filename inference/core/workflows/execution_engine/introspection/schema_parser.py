@@ -1,7 +1,8 @@
 import itertools
-from collections import OrderedDict, defaultdict
+from collections import defaultdict
 from dataclasses import replace
-from typing import Dict, Optional, Type
+from functools import lru_cache
+from typing import Dict, List, Optional, Type
 
 from inference.core.workflows.execution_engine.entities.types import (
     KIND_KEY,
@@ -47,9 +48,13 @@ DESCRIPTION_KEY = "description"
 ALL_OF_KEY = "allOf"
 ANY_OF_KEY = "anyOf"
 ONE_OF_KEY = "oneOf"
+UNION_KEYS = (ANY_OF_KEY, ONE_OF_KEY, ALL_OF_KEY)
+UNION_KEYS_SET = frozenset(UNION_KEYS)
 OBJECT_TYPE = "object"
 
 
+# bounded, as dynamic blocks define fresh manifest types each time they are compiled
+@lru_cache(maxsize=1024)
 def parse_block_manifest(
     manifest_type: Type[WorkflowBlockManifest],
 ) -> BlockManifestMetadata:
@@ -97,7 +102,7 @@ def retrieve_primitives_from_schema(schema: dict) -> Dict[str, PrimitiveTypeDefi
         )
         if primitive_metadata is not None:
             result.append(primitive_metadata)
-    return OrderedDict((r.property_name, r) for r in result)
+    return {r.property_name: r for r in result}
 
 
 def retrieve_primitive_type_from_property(
@@ -105,24 +110,35 @@ def retrieve_primitive_type_from_property(
     property_description: str,
     property_definition: dict,
 ) -> Optional[PrimitiveTypeDefinition]:
-    if REFERENCE_KEY in property_definition:
-        return None
-    if ITEMS_KEY in property_definition:
-        result = retrieve_primitive_type_from_property(
-            property_name=property_name,
-            property_description=property_description,
-            property_definition=property_definition[ITEMS_KEY],
-        )
-        if result is None:
-            return None
-        high_level_type = (
+    # collections are peeled off iteratively, so that nested lists do not recurse
+    collection_types = []
+    while ITEMS_KEY in property_definition and REFERENCE_KEY not in property_definition:
+        collection_types.append(
             SET_TYPE_NAME
             if property_definition.get(UNIQUE_ITEMS_KEY, False) is True
             else LIST_TYPE_NAME
         )
-        return replace(
-            result, type_annotation=f"{high_level_type}[{result.type_annotation}]"
-        )
+        property_definition = property_definition[ITEMS_KEY]
+    result = retrieve_primitive_type_from_non_collection_property(
+        property_name=property_name,
+        property_description=property_description,
+        property_definition=property_definition,
+    )
+    if result is None or not collection_types:
+        return result
+    type_annotation = result.type_annotation
+    for collection_type in reversed(collection_types):
+        type_annotation = f"{collection_type}[{type_annotation}]"
+    return replace(result, type_annotation=type_annotation)
+
+
+def retrieve_primitive_type_from_non_collection_property(
+    property_name: str,
+    property_description: str,
+    property_definition: dict,
+) -> Optional[PrimitiveTypeDefinition]:
+    if REFERENCE_KEY in property_definition:
+        return None
     if property_definition.get(TYPE_KEY) in TYPE_MAPPING:
         type_name = TYPE_MAPPING[property_definition[TYPE_KEY]]
         return PrimitiveTypeDefinition(
@@ -160,11 +176,7 @@ def retrieve_primitive_type_from_union_property(
     property_description: str,
     union_definition: dict,
 ) -> Optional[PrimitiveTypeDefinition]:
-    union_types = (
-        union_definition.get(ANY_OF_KEY, [])
-        + union_definition.get(ONE_OF_KEY, [])
-        + union_definition.get(ALL_OF_KEY, [])
-    )
+    union_types = retrieve_union_types(union_definition=union_definition)
     primitive_union_types = [e for e in union_types if REFERENCE_KEY not in e]
     union_types_metadata = []
     for union_type in primitive_union_types:
@@ -268,7 +280,7 @@ def retrieve_selectors_from_schema(
             )
         if selector is not None:
             result.append(selector)
-    return OrderedDict((r.property_name, r) for r in result)
+    return {r.property_name: r for r in result}
 
 
 def retrieve_selectors_from_simple_property(
@@ -325,10 +337,14 @@ def retrieve_selectors_from_simple_property(
 
 
 def property_defines_union(property_definition: dict) -> bool:
-    return (
-        ANY_OF_KEY in property_definition
-        or ONE_OF_KEY in property_definition
-        or ALL_OF_KEY in property_definition
+    return not UNION_KEYS_SET.isdisjoint(property_definition.keys())
+
+
+def retrieve_union_types(union_definition: dict) -> List[dict]:
+    return list(
+        itertools.chain.from_iterable(
+            union_definition.get(key) or () for key in UNION_KEYS
+        )
     )
 
 
@@ -341,11 +357,7 @@ def retrieve_selectors_from_union_definition(
     property_dimensionality_offset: int,
     is_dimensionality_reference_property: bool,
 ) -> Optional[SelectorDefinition]:
-    union_types = (
-        union_definition.get(ANY_OF_KEY, [])
-        + union_definition.get(ONE_OF_KEY, [])
-        + union_definition.get(ALL_OF_KEY, [])
-    )
+    union_types = retrieve_union_types(union_definition=union_definition)
     results = []
     for type_definition in union_types:
         result = retrieve_selectors_from_simple_property(
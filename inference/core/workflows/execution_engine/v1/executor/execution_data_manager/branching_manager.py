@@ -1,4 +1,4 @@
-from typing import Dict, Set, Union
+from typing import Dict, Set, Tuple, Union
 
 from inference.core.workflows.errors import ExecutionEngineRuntimeError
 from inference.core.workflows.execution_engine.v1.executor.execution_data_manager.dynamic_batches_manager import (
@@ -13,9 +13,9 @@ class BranchingManager:
         return cls(masks={})
 
     def __init__(self, masks: Dict[str, Union[Set[DynamicBatchIndex], bool]]):
-        self._masks = masks
-        self._batch_compatibility = {
-            branch_name: not isinstance(mask, bool)
+        # mask and batch-compatibility flag kept together to be fetched with single lookup
+        self._entries: Dict[str, Tuple[Union[Set[DynamicBatchIndex], bool], bool]] = {
+            branch_name: (mask, not isinstance(mask, bool))
             for branch_name, mask in masks.items()
         }
 
@@ -24,7 +24,7 @@ class BranchingManager:
         execution_branch: str,
         mask: Set[DynamicBatchIndex],
     ) -> None:
-        if execution_branch in self._masks:
+        if execution_branch in self._entries:
             raise ExecutionEngineRuntimeError(
                 public_message=f"Attempted to re-register maks for execution branch: {execution_branch}. "
                 f"This is most likely a bug. Contact Roboflow team through github issues "
@@ -32,11 +32,10 @@ class BranchingManager:
                 f"the problem - including workflow definition you use.",
                 context="workflow_execution | step_input_assembling",
             )
-        self._batch_compatibility[execution_branch] = True
-        self._masks[execution_branch] = mask
+        self._entries[execution_branch] = (mask, True)
 
     def register_non_batch_mask(self, execution_branch: str, mask: bool) -> None:
-        if execution_branch in self._masks:
+        if execution_branch in self._entries:
             raise ExecutionEngineRuntimeError(
                 public_message=f"Attempted to re-register maks for execution branch: {execution_branch}. "
                 f"This is most likely a bug. Contact Roboflow team through github issues "
@@ -44,11 +43,11 @@ class BranchingManager:
                 f"the problem - including workflow definition you use.",
                 context="workflow_execution | step_input_assembling",
             )
-        self._batch_compatibility[execution_branch] = False
-        self._masks[execution_branch] = mask
+        self._entries[execution_branch] = (mask, False)
 
     def get_mask(self, execution_branch: str) -> Union[Set[DynamicBatchIndex], bool]:
-        if execution_branch not in self._masks:
+        entry = self._entries.get(execution_branch)
+        if entry is None:
             raise ExecutionEngineRuntimeError(
                 public_message=f"Attempted to get mask for not registered execution branch: {execution_branch}. "
                 f"This is most likely a bug. Contact Roboflow team through github issues "
@@ -56,10 +55,11 @@ class BranchingManager:
                 f"the problem - including workflow definition you use.",
                 context="workflow_execution | step_input_assembling",
             )
-        return self._masks[execution_branch]
+        return entry[0]
 
     def is_execution_branch_batch_oriented(self, execution_branch: str) -> bool:
-        if execution_branch not in self._batch_compatibility:
+        entry = self._entries.get(execution_branch)
+        if entry is None:
             raise ExecutionEngineRuntimeError(
                 public_message=f"Attempted to get info about not registered execution branch: {execution_branch}. "
                 f"This is most likely a bug. Contact Roboflow team through github issues "
@@ -67,7 +67,7 @@ class BranchingManager:
                 f"the problem - including workflow definition you use.",
                 context="workflow_execution | step_input_assembling",
             )
-        return self._batch_compatibility[execution_branch]
+        return entry[1]
 
     def is_execution_branch_registered(self, execution_branch: str) -> bool:
-        return execution_branch in self._masks
+        return execution_branch in self._entries
@@ -32,26 +32,26 @@ class ParallelStepExecutionCoordinator(StepExecutionCoordinator):
         return cls(execution_graph=execution_graph)
 
     def __init__(self, execution_graph: nx.DiGraph):
-        self._execution_graph = execution_graph.copy()
+        # graph is only read, so it is not copied - caller must not mutate it afterwards
+        self._execution_graph = execution_graph
         self.__execution_order: Optional[List[List[str]]] = None
         self.__execution_pointer = 0
 
     def get_steps_to_execute_next(self) -> Optional[List[str]]:
         if self.__execution_order is None:
-            self.__execution_order = establish_execution_order(
-                execution_graph=self._execution_graph
-            )
-            self.__execution_pointer = 0
-        next_step = None
-        while self.__execution_pointer < len(self.__execution_order):
-            candidate_steps = [
-                e for e in self.__execution_order[self.__execution_pointer]
+            self.__execution_order = [
+                level
+                for level in establish_execution_order(
+                    execution_graph=self._execution_graph
+                )
+                if len(level) > 0
             ]
-            self.__execution_pointer += 1
-            if len(candidate_steps) == 0:
-                continue
-            return candidate_steps
-        return next_step
+            self.__execution_pointer = 0
+        if self.__execution_pointer >= len(self.__execution_order):
+            return None
+        candidate_steps = list(self.__execution_order[self.__execution_pointer])
+        self.__execution_pointer += 1
+        return candidate_steps
 
 
 def establish_execution_order(
@@ -85,15 +85,13 @@ def construct_steps_flow_graph(
         execution_graph=execution_graph,
         category=NodeCategory.STEP_NODE,
     )
+    steps_flow_graph.add_nodes_from(step_nodes)
+    for source, target in execution_graph.edges():
+        if target not in step_nodes:
+            continue
+        start_node = source if source in step_nodes else super_start_node
+        steps_flow_graph.add_edge(start_node, target)
     for step_node in step_nodes:
-        has_predecessors = False
-        for predecessor in execution_graph.predecessors(step_node):
-            start_node = predecessor if predecessor in step_nodes else super_start_node
-            steps_flow_graph.add_edge(start_node, step_node)
-            has_predecessors = True
-        if not has_predecessors:
+        if steps_flow_graph.in_degree(step_node) == 0:
             steps_flow_graph.add_edge(super_start_node, step_node)
-        for successor in execution_graph.successors(step_node):
-            if successor in step_nodes:
-                steps_flow_graph.add_edge(step_node, successor)
     return steps_flow_graph
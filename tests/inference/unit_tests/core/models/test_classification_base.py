@@ -0,0 +1,570 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from unittest.mock import MagicMock
+
+import cv2
+import numpy as np
+import onnx
+import onnxruntime
+from onnx import TensorProto, helper
+
+from inference.core.models import classification_base
+from inference.core.models.classification_base import (
+    ClassificationBaseOnnxRoboflowInferenceModel,
+    get_quantized_weights_path,
+    make_label_button,
+    runs_on_cpu_execution_provider,
+)
+
+
+def _build_model(
+    class_names: list, multiclass: bool = False
+) -> ClassificationBaseOnnxRoboflowInferenceModel:
+    model = ClassificationBaseOnnxRoboflowInferenceModel.__new__(
+        ClassificationBaseOnnxRoboflowInferenceModel
+    )
+    model.class_names = class_names
+    model._class_names_arr = np.asarray(class_names, dtype=object)
+    model.multiclass = multiclass
+    model._input_buffers = threading.local()
+    model._optimal_batch = float("inf")
+    model._cpu_concurrent_runs = 1
+    model._cpu_runs_pinned = False
+    model._cpu_executor = None
+    return model
+
+
+def _build_global_average_pool_session() -> onnxruntime.InferenceSession:
+    graph = helper.make_graph(
+        nodes=[
+            helper.make_node(
+                "GlobalAveragePool", inputs=["images"], outputs=["pooled"]
+            ),
+            helper.make_node("Flatten", inputs=["pooled"], outputs=["scores"]),
+        ],
+        name="global_average_pool",
+        inputs=[
+            helper.make_tensor_value_info(
+                "images", TensorProto.FLOAT, ["batch", 3, 2, 2]
+            )
+        ],
+        outputs=[
+            helper.make_tensor_value_info("scores", TensorProto.FLOAT, ["batch", 3])
+        ],
+    )
+    model_proto = helper.make_model(
+        graph, opset_imports=[helper.make_opsetid("", 13)], ir_version=8
+    )
+    onnx.checker.check_model(model_proto)
+    return onnxruntime.InferenceSession(
+        model_proto.SerializeToString(), providers=["CPUExecutionProvider"]
+    )
+
+
+def test_preprocess_normalises_pixel_values_to_minus_one_one_range() -> None:
+    # given
+    model = _build_model(class_names=["a", "b"])
+    raw = np.array([0.0, 127.5, 255.0], dtype=np.float32).reshape(1, 3, 1, 1)
+    raw = np.broadcast_to(raw, (1, 3, 2, 2)).copy()
+    model.preproc_image = MagicMock(return_value=(raw, (2, 2)))
+
+    # when
+    img_in, metadata = model.preprocess(image="some")
+
+    # then
+    assert img_in.dtype == np.float32
+    assert np.allclose(img_in[0, 0], -1.0)
+    assert np.allclose(img_in[0, 1], 0.0)
+    assert np.allclose(img_in[0, 2], 1.0)
+    assert metadata["img_dims"] == [(2, 2)]
+
+
+def test_make_response_for_single_label_model_sorts_classes_by_confidence() -> None:
+    # given
+    model = _build_model(class_names=["cat", "dog", "bird"])
+    logits = np.array([[1.0, 3.0, 2.0]], dtype=np.float32)
+
+    # when
+    result = model.make_response(predictions=logits, img_dims=[(100, 200)])
+
+    # then
+    assert len(result) == 1
+    assert [p.class_name for p in result[0].predictions] == ["dog", "bird", "cat"]
+    assert [p.class_id for p in result[0].predictions] == [1, 2, 0]
+    assert result[0].top == "dog"
+    assert abs(result[0].confidence - 0.6652) < 1e-6
+    assert abs(sum(p.confidence for p in result[0].predictions) - 1.0) < 1e-3
+
+
+def test_softmax_normalises_each_row_of_batched_input_independently() -> None:
+    # given
+    logits = np.array([[1.0, 2.0, 3.0], [1000.0, 1000.0, 1000.0]], dtype=np.float32)
+
+    # when
+    result = ClassificationBaseOnnxRoboflowInferenceModel.softmax(logits, axis=1)
+
+    # then
+    assert result.shape == (2, 3)
+    assert np.allclose(result.sum(axis=1), 1.0)
+    assert np.allclose(result[0], [0.09003057, 0.24472847, 0.66524096])
+    assert np.allclose(result[1], 1 / 3)
+    assert logits[0, 0] == 1.0, "Input must not be modified"
+
+
+def test_softmax_keeps_float64_precision_of_input() -> None:
+    # given
+    logits = np.array([[0.0, 1e-9]], dtype=np.float64)
+
+    # when
+    result = ClassificationBaseOnnxRoboflowInferenceModel.softmax(logits, axis=1)
+
+    # then
+    assert result.dtype == np.float64
+    assert result[0, 1] > result[0, 0]
+
+
+def test_make_response_for_single_label_model_returns_response_per_batch_element() -> (
+    None
+):
+    # given
+    model = _build_model(class_names=["cat", "dog"])
+    logits = np.array([[2.0, 1.0], [1.0, 2.0], [0.0, 0.0]], dtype=np.float32)
+
+    # when
+    result = model.make_response(
+        predictions=logits, img_dims=[(100, 200), (300, 400), (500, 600)]
+    )
+
+    # then
+    assert [r.top for r in result] == ["cat", "dog", "cat"]
+    assert [(r.image.width, r.image.height) for r in result] == [
+        (200, 100),
+        (400, 300),
+        (600, 500),
+    ]
+    assert [p.class_id for p in result[2].predictions] == [0, 1]
+
+
+def test_make_response_for_multi_label_model_applies_confidence_threshold() -> None:
+    # given
+    model = _build_model(class_names=["cat", "dog", "bird"], multiclass=True)
+    scores = np.array([[0.9, 0.2, 0.6], [0.1, 0.3, 0.4]], dtype=np.float32)
+
+    # when
+    result = model.make_response(
+        predictions=scores, img_dims=[(100, 200), (300, 400)], confidence=0.5
+    )
+
+    # then
+    assert len(result) == 2
+    assert result[0].predicted_classes == ["cat", "bird"]
+    assert result[1].predicted_classes == []
+    assert result[0].predictions["dog"].class_id == 1
+    assert abs(result[0].predictions["dog"].confidence - 0.2) < 1e-6
+
+
+def test_preprocess_of_batch_reuses_input_buffer_between_calls() -> None:
+    # given
+    model = _build_model(class_names=["a", "b"])
+    first = np.full((1, 3, 2, 2), 255.0, dtype=np.float32)
+    second = np.zeros((1, 3, 2, 2), dtype=np.float32)
+    model.preproc_image = MagicMock(
+        side_effect=[(first.copy(), (2, 2)), (second.copy(), (2, 2))] * 2
+    )
+
+    # when
+    first_result, first_metadata = model.preprocess(image=["a", "b"])
+    first_result_copy = first_result.copy()
+    second_result, _ = model.preprocess(image=["a", "b"])
+
+    # then
+    assert np.shares_memory(second_result, first_result)
+    assert np.allclose(first_result_copy[0], 1.0)
+    assert np.allclose(first_result_copy[1], -1.0)
+    assert np.allclose(second_result, first_result_copy)
+    assert first_metadata["img_dims"] == [(2, 2), (2, 2)]
+
+
+def test_get_input_buffer_keeps_single_buffer_per_thread() -> None:
+    # given
+    model = _build_model(class_names=["a", "b"])
+
+    # when
+    big = model._get_input_buffer(shape=(4, 3, 2, 2), dtype=np.float32)
+    small = model._get_input_buffer(shape=(2, 3, 2, 2), dtype=np.float32)
+    bigger = model._get_input_buffer(shape=(8, 3, 2, 2), dtype=np.float32)
+    other_size = model._get_input_buffer(shape=(2, 3, 4, 4), dtype=np.float32)
+
+    # then
+    assert small.shape == (2, 3, 2, 2)
+    assert np.shares_memory(small, big), "Smaller batch expected to reuse buffer"
+    assert bigger.shape == (8, 3, 2, 2)
+    assert not np.shares_memory(bigger, big), "Bigger batch expected to grow buffer"
+    assert other_size.shape == (2, 3, 4, 4)
+    assert model._input_buffers.buffer is other_size.base
+
+
+def test_predict_splits_batch_bigger_than_optimal_into_sub_batches() -> None:
+    # given
+    model = _build_model(class_names=["a", "b", "c"])
+    model._optimal_batch = 2
+    model._run_onnx_session = MagicMock(side_effect=lambda x: [x.sum(axis=(2, 3))])
+    img_in = np.random.rand(5, 3, 2, 2).astype(np.float32)
+
+    # when
+    result = model.predict(img_in)
+
+    # then
+    assert model._run_onnx_session.call_count == 3
+    assert len(result[0]) == 1
+    assert np.allclose(result[0][0], img_in.sum(axis=(2, 3)))
+
+
+def test_predict_runs_onnx_session_through_io_binding() -> None:
+    # given
+    model = _build_model(class_names=["a", "b", "c"])
+    model._optimal_batch = 2
+    model.onnx_session = _build_global_average_pool_session()
+    model.input_name = "images"
+    model._output_names = ["scores"]
+    img_in = np.random.rand(5, 3, 2, 2).astype(np.float32)
+
+    # when
+    result = model.predict(img_in)
+    single_run_result = model._run_onnx_session(img_in[:1])
+
+    # then
+    assert len(result[0]) == 1
+    assert result[0][0].shape == (5, 3)
+    assert np.allclose(result[0][0], img_in.mean(axis=(2, 3)), atol=1e-6)
+    assert np.allclose(single_run_result[0], img_in[:1].mean(axis=(2, 3)), atol=1e-6)
+
+
+def test_predict_accepts_batch_given_as_list_of_images() -> None:
+    # given
+    model = _build_model(class_names=["a", "b", "c"])
+    model._optimal_batch = 2
+    model.onnx_session = _build_global_average_pool_session()
+    model.input_name = "images"
+    model._output_names = ["scores"]
+    images = [np.random.rand(3, 2, 2).astype(np.float32) for _ in range(3)]
+
+    # when
+    result = model.predict(images)
+
+    # then
+    assert result[0][0].shape == (3, 3)
+    assert np.allclose(result[0][0], np.stack(images).mean(axis=(2, 3)), atol=1e-6)
+
+
+def test_predict_runs_batch_not_bigger_than_optimal_at_once() -> None:
+    # given
+    model = _build_model(class_names=["a", "b", "c"])
+    model._optimal_batch = 2
+    model._run_onnx_session = MagicMock(side_effect=lambda x: [x.sum(axis=(2, 3))])
+    img_in = np.random.rand(2, 3, 2, 2).astype(np.float32)
+
+    # when
+    result = model.predict(img_in)
+
+    # then
+    assert model._run_onnx_session.call_count == 1
+    assert np.allclose(result[0][0], img_in.sum(axis=(2, 3)))
+
+
+def test_predict_shards_batch_across_concurrent_cpu_runs() -> None:
+    # given
+    model = _build_model(class_names=["a", "b", "c"])
+    model._cpu_concurrent_runs = 2
+    model._cpu_executor = ThreadPoolExecutor(max_workers=2)
+    model._run_onnx_session = MagicMock(side_effect=lambda x: [x.sum(axis=(2, 3))])
+    img_in = np.random.rand(5, 3, 2, 2).astype(np.float32)
+
+    # when
+    result = model.predict(img_in)
+
+    # then
+    assert model._run_onnx_session.call_count == 2
+    assert np.allclose(result[0][0], img_in.sum(axis=(2, 3)))
+
+
+def test_predict_runs_sub_batches_in_calling_thread_when_cpu_executor_shut_down() -> (
+    None
+):
+    # given
+    model = _build_model(class_names=["a", "b", "c"])
+    model._cpu_concurrent_runs = 2
+    model._cpu_executor = ThreadPoolExecutor(max_workers=2)
+    model._cpu_executor.shutdown()
+    model._run_onnx_session = MagicMock(side_effect=lambda x: [x.sum(axis=(2, 3))])
+    img_in = np.random.rand(5, 3, 2, 2).astype(np.float32)
+
+    # when
+    result = model.predict(img_in)
+
+    # then
+    assert model._run_onnx_session.call_count == 2
+    assert np.allclose(result[0][0], img_in.sum(axis=(2, 3)))
+
+
+@mock.patch.object(classification_base.onnxruntime, "get_available_providers")
+def test_runs_on_cpu_execution_provider_when_gpu_provider_not_available(
+    get_available_providers_mock: MagicMock,
+) -> None:
+    # given
+    get_available_providers_mock.return_value = ["CPUExecutionProvider"]
+
+    # when
+    result = runs_on_cpu_execution_provider(
+        providers=[("CUDAExecutionProvider", {}), "CPUExecutionProvider"]
+    )
+
+    # then
+    assert result is True
+
+
+@mock.patch.object(classification_base.onnxruntime, "get_available_providers")
+def test_runs_on_cpu_execution_provider_when_gpu_provider_available(
+    get_available_providers_mock: MagicMock,
+) -> None:
+    # given
+    get_available_providers_mock.return_value = [
+        "CUDAExecutionProvider",
+        "CPUExecutionProvider",
+    ]
+
+    # when
+    result = runs_on_cpu_execution_provider(
+        providers=[("CUDAExecutionProvider", {}), "CPUExecutionProvider"]
+    )
+
+    # then
+    assert result is False
+
+
+@mock.patch.object(classification_base, "runs_on_cpu_execution_provider")
+def test_get_onnx_session_options_pins_cpu_session_to_single_thread(
+    runs_on_cpu_execution_provider_mock: MagicMock,
+) -> None:
+    # given
+    runs_on_cpu_execution_provider_mock.return_value = True
+    model = _build_model(class_names=["a", "b"])
+    model._cpu_concurrent_runs = 4
+
+    # when
+    session_options = model.get_onnx_session_options(providers=["CPUExecutionProvider"])
+
+    # then
+    assert session_options.intra_op_num_threads == 1
+    assert model._cpu_runs_pinned is True
+
+
+@mock.patch.object(classification_base, "runs_on_cpu_execution_provider")
+def test_get_onnx_session_options_does_not_pin_gpu_session(
+    runs_on_cpu_execution_provider_mock: MagicMock,
+) -> None:
+    # given
+    runs_on_cpu_execution_provider_mock.return_value = False
+    model = _build_model(class_names=["a", "b"])
+    model._cpu_concurrent_runs = 4
+
+    # when
+    session_options = model.get_onnx_session_options(
+        providers=["CUDAExecutionProvider", "CPUExecutionProvider"]
+    )
+
+    # then
+    assert session_options.intra_op_num_threads == 0
+    assert model._cpu_runs_pinned is False
+
+
+@mock.patch.object(classification_base.OnnxRoboflowInferenceModel, "clear_cache")
+def test_clear_cache_shuts_down_cpu_executor(clear_cache_mock: MagicMock) -> None:
+    # given
+    model = _build_model(class_names=["a", "b"])
+    executor = ThreadPoolExecutor(max_workers=2)
+    model._cpu_executor = executor
+
+    # when
+    model.clear_cache()
+
+    # then
+    assert model._cpu_executor is None
+    assert executor._shutdown is True
+    clear_cache_mock.assert_called_once()
+
+
+def test_get_quantized_weights_path() -> None:
+    # when
+    result = get_quantized_weights_path(
+        quantized_weights_dir="/quantized",
+        model_id="some/1",
+        weights_file="weights.onnx",
+    )
+
+    # then
+    assert result == "/quantized/some/1/weights.quant.onnx"
+
+
+@mock.patch.object(
+    ClassificationBaseOnnxRoboflowInferenceModel,
+    "weights_file",
+    new_callable=mock.PropertyMock,
+    return_value="weights.onnx",
+)
+def test_get_onnx_weights_path_when_quantized_weights_dir_not_set(
+    _weights_file_mock: MagicMock,
+    empty_local_dir: str,
+) -> None:
+    # given
+    model = _build_model(class_names=["a", "b"])
+    model.endpoint = "some/1"
+    model.cache_file = lambda f: os.path.join(empty_local_dir, "cache", f)
+
+    # when
+    with mock.patch.object(classification_base, "QUANTIZED_WEIGHTS_DIR", None):
+        result = model.get_onnx_weights_path()
+
+    # then
+    assert result == os.path.join(empty_local_dir, "cache", "weights.onnx")
+
+
+@mock.patch.object(
+    ClassificationBaseOnnxRoboflowInferenceModel,
+    "weights_file",
+    new_callable=mock.PropertyMock,
+    return_value="weights.onnx",
+)
+def test_get_onnx_weights_path_when_quantized_weights_available(
+    _weights_file_mock: MagicMock,
+    empty_local_dir: str,
+) -> None:
+    # given
+    model = _build_model(class_names=["a", "b"])
+    model.endpoint = "some/1"
+    model.cache_file = lambda f: os.path.join(empty_local_dir, "cache", f)
+    quantized_weights_dir = os.path.join(empty_local_dir, "quantized")
+    os.makedirs(os.path.join(quantized_weights_dir, "some", "1"))
+    with open(
+        os.path.join(quantized_weights_dir, "some", "1", "weights.quant.onnx"), "wb"
+    ) as f:
+        f.write(b"")
+
+    # when
+    with mock.patch.object(
+        classification_base, "QUANTIZED_WEIGHTS_DIR", quantized_weights_dir
+    ):
+        result = model.get_onnx_weights_path()
+
+    # then
+    assert result == os.path.join(
+        quantized_weights_dir, "some", "1", "weights.quant.onnx"
+    )
+
+
+@mock.patch.object(
+    ClassificationBaseOnnxRoboflowInferenceModel,
+    "weights_file",
+    new_callable=mock.PropertyMock,
+    return_value="weights.onnx",
+)
+def test_get_onnx_weights_path_when_quantized_weights_not_available(
+    _weights_file_mock: MagicMock,
+    empty_local_dir: str,
+) -> None:
+    # given
+    model = _build_model(class_names=["a", "b"])
+    model.endpoint = "some/1"
+    model.cache_file = lambda f: os.path.join(empty_local_dir, "cache", f)
+
+    # when
+    with mock.patch.object(
+        classification_base,
+        "QUANTIZED_WEIGHTS_DIR",
+        os.path.join(empty_local_dir, "quantized"),
+    ):
+        result = model.get_onnx_weights_path()
+
+    # then
+    assert result == os.path.join(empty_local_dir, "cache", "weights.onnx")
+
+
+def test_draw_predictions_for_single_label_model_returns_jpeg_of_input_size() -> None:
+    # given
+    model = _build_model(class_names=["cat", "dog"])
+    model.colors = {"cat": "#ff0000"}
+    response = model.make_response(
+        predictions=np.array([[2.0, 1.0]], dtype=np.float32), img_dims=[(48, 64)]
+    )[0]
+    request = MagicMock()
+    request.image = np.zeros((48, 64, 3), dtype=np.uint8)
+    request.visualization_stroke_width = 1
+
+    # when
+    result = model.draw_predictions(request, response)
+
+    # then
+    decoded = cv2.imdecode(np.frombuffer(result, dtype=np.uint8), cv2.IMREAD_COLOR)
+    assert decoded.shape == (48, 64, 3)
+    assert decoded[2, 2, 2] > 200, "Expected button coloured with class colour"
+
+
+def test_draw_predictions_for_multi_label_model_returns_jpeg_of_input_size() -> None:
+    # given
+    model = _build_model(class_names=["cat", "dog"], multiclass=True)
+    model.colors = {}
+    response = model.make_response(
+        predictions=np.array([[0.9, 0.7]], dtype=np.float32), img_dims=[(96, 128)]
+    )[0]
+    request = MagicMock()
+    request.image = np.zeros((96, 128, 3), dtype=np.uint8)
+    request.visualization_stroke_width = 1
+
+    # when
+    result = model.draw_predictions(request, response)
+
+    # then
+    decoded = cv2.imdecode(np.frombuffer(result, dtype=np.uint8), cv2.IMREAD_COLOR)
+    assert decoded.shape == (96, 128, 3)
+
+
+def test_make_label_button_reuses_rendered_buttons() -> None:
+    # when
+    first = make_label_button(text="cat 0.95", color="#4892EA")
+    second = make_label_button(text="cat 0.95", color="#4892EA")
+    other = make_label_button(text="dog 0.95", color="#4892EA")
+
+    # then
+    assert first is second
+    assert other is not first
+    assert first.mode == "RGBA"
+    assert first.getpixel((0, 0)) == (72, 146, 234, 255)
+
+
+def test_draw_predictions_for_multi_label_model_stacks_buttons_by_confidence() -> None:
+    # given
+    model = _build_model(class_names=["cat", "hippopotamus"], multiclass=True)
+    model.colors = {"cat": "#ff0000", "hippopotamus": "#0000ff"}
+    response = model.make_response(
+        predictions=np.array([[0.2, 0.7]], dtype=np.float32), img_dims=[(200, 200)]
+    )[0]
+    request = MagicMock()
+    request.image = np.zeros((200, 200, 3), dtype=np.uint8)
+    request.visualization_stroke_width = 1
+    hippo_button = make_label_button(text="hippopotamus 0.70", color="#0000ff")
+    cat_button = make_label_button(text="cat 0.20", color="#ff0000")
+
+    # when
+    result = model.draw_predictions(request, response)
+
+    # then
+    decoded = cv2.imdecode(np.frombuffer(result, dtype=np.uint8), cv2.IMREAD_COLOR)
+    cat_row = hippo_button.size[1] + 5
+    assert decoded[5, 5, 0] > 200, "Expected first row to be blue button"
+    assert decoded[cat_row, 5, 2] > 200, "Expected second row to be red button"
+    assert hippo_button.size[0] > cat_button.size[0] + 10
+    assert (
+        decoded[cat_row, hippo_button.size[0] - 5].max() < 50
+    ), "Expected image not to be covered next to narrower button"
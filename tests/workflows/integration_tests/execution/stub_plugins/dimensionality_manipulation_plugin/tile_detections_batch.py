@@ -73,6 +73,10 @@ class BlockManifest(WorkflowBlockManifest):
 
 class TileDetectionsBatchBlock(WorkflowBlock):
 
+    def __init__(self):
+        # annotator holds no per-call state, so single instance is shared across runs
+        self._annotator = sv.BoundingBoxAnnotator()
+
     @classmethod
     def get_manifest(cls) -> Type[WorkflowBlockManifest]:
         return BlockManifest
@@ -82,12 +86,11 @@ class TileDetectionsBatchBlock(WorkflowBlock):
         images_crops: Batch[Batch[WorkflowImageData]],
         crops_predictions: Batch[Batch[sv.Detections]],
     ) -> BlockResult:
-        annotator = sv.BoundingBoxAnnotator()
         visualisations = []
         for image_crops, crop_predictions in zip(images_crops, crops_predictions):
             visualisations_batch_element = []
             for image, prediction in zip(image_crops, crop_predictions):
-                annotated_image = annotator.annotate(
+                annotated_image = self._annotator.annotate(
                     image.numpy_image.copy(),
                     prediction,
                 )
@@ -2,6 +2,7 @@
 This is just example, test implementation, please do not assume it being fully functional.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Literal, Type, Union
 
 import supervision as sv
@@ -69,6 +70,10 @@ class BlockManifest(WorkflowBlockManifest):
 
 class TileDetectionsNonBatchBlock(WorkflowBlock):
 
+    def __init__(self):
+        # annotator holds no per-call state, so single instance is shared across runs
+        self._annotator = sv.BoundingBoxAnnotator()
+
     @classmethod
     def get_manifest(cls) -> Type[WorkflowBlockManifest]:
         return BlockManifest
@@ -78,13 +83,23 @@ class TileDetectionsNonBatchBlock(WorkflowBlock):
         crops: Batch[WorkflowImageData],
         crops_predictions: Batch[sv.Detections],
     ) -> BlockResult:
-        annotator = sv.BoundingBoxAnnotator()
-        visualisations = []
-        for image, prediction in zip(crops, crops_predictions):
-            annotated_image = annotator.annotate(
-                image.numpy_image.copy(),
-                prediction,
+        # kept synchronous on purpose - Execution Engine calls `run(...)` directly
+        # from its own pool of step threads, so there is no event loop to unblock
+
+        # images are resolved once, so any lazy decoding happens here rather than
+        # in annotation workers
+        images = [crop.numpy_image for crop in crops]
+        # OpenCV drawing releases the GIL, so crops are annotated in parallel - pool
+        # lives only for this call, so importing the plugin does not spawn threads
+        with ThreadPoolExecutor() as executor:
+            visualisations = list(
+                executor.map(
+                    lambda image_and_prediction: self._annotator.annotate(
+                        image_and_prediction[0].copy(),
+                        image_and_prediction[1],
+                    ),
+                    zip(images, crops_predictions),
+                )
             )
-            visualisations.append(annotated_image)
         tile = sv.create_tiles(visualisations)
         return {"visualisations": tile}
@@ -10,6 +10,7 @@ from inference.core.workflows.execution_engine.v1.compiler.entities import (
 )
 from inference.core.workflows.execution_engine.v1.executor.flow_coordinator import (
     ParallelStepExecutionCoordinator,
+    construct_steps_flow_graph,
 )
 
 
@@ -153,6 +154,39 @@ def test_parallel_flow_coordinator_when_there_are_two_parallel_execution_paths()
     assert result is None, "Execution path should end up to this point"
 
 
+def test_construct_steps_flow_graph_connects_steps_without_step_predecessors_to_start() -> (
+    None
+):
+    # given
+    graph = nx.DiGraph()
+    graph.add_node("input_1", node_compilation_output=assembly_dummy_input("input_1"))
+    graph.add_node("step_1", node_compilation_output=assembly_dummy_step("step_1"))
+    graph.add_node("step_2", node_compilation_output=assembly_dummy_step("step_2"))
+    graph.add_node("step_3", node_compilation_output=assembly_dummy_step("step_3"))
+    graph.add_node(
+        "output_1", node_compilation_output=assembly_dummy_output("output_1")
+    )
+    graph.add_edge("input_1", "step_1")
+    graph.add_edge("step_1", "step_2")
+    graph.add_edge("input_1", "step_2")
+    graph.add_edge("step_2", "output_1")
+    graph.add_edge("step_3", "output_1")
+
+    # when
+    result = construct_steps_flow_graph(
+        execution_graph=graph, super_start_node="<start>"
+    )
+
+    # then
+    assert set(result.nodes) == {"<start>", "step_1", "step_2", "step_3"}
+    assert set(result.edges) == {
+        ("<start>", "step_1"),
+        ("<start>", "step_2"),
+        ("step_1", "step_2"),
+        ("<start>", "step_3"),
+    }
+
+
 def assembly_dummy_input(name: str) -> InputNode:
     return InputNode(
         node_category=NodeCategory.INPUT_NODE,
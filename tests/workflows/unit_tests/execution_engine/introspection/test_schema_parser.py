@@ -509,3 +509,46 @@ def test_parse_block_manifest_when_manifest_defines_selector_inside_dictionary()
             )
         },
     )
+
+
+def test_parse_block_manifest_reuses_result_for_the_same_manifest_type() -> None:
+    # given
+
+    class Manifest(WorkflowBlockManifest):
+        type: Literal["MyManifest"]
+        name: str = Field(description="name field")
+        some_integer: int
+
+        @classmethod
+        def describe_outputs(cls) -> List[OutputDefinition]:
+            return []
+
+    # when
+    first_result = parse_block_manifest(manifest_type=Manifest)
+    second_result = parse_block_manifest(manifest_type=Manifest)
+
+    # then
+    assert first_result is second_result
+
+
+def test_parse_block_manifest_when_manifest_defines_nested_collections() -> None:
+    # given
+
+    class Manifest(WorkflowBlockManifest):
+        type: Literal["MyManifest"]
+        name: str = Field(description="name field")
+        nested: List[List[Set[int]]]
+
+        @classmethod
+        def describe_outputs(cls) -> List[OutputDefinition]:
+            return []
+
+    # when
+    manifest_metadata = parse_block_manifest(manifest_type=Manifest)
+
+    # then
+    assert manifest_metadata.primitive_types["nested"] == PrimitiveTypeDefinition(
+        property_name="nested",
+        property_description="not available",
+        type_annotation="List[List[Set[int]]]",
+    )